@@ -27,7 +27,7 @@ class Card ():
 
     # the basics
     STR_RANKS = '23456789TJQKA'
-    INT_RANKS = range(13)
+    INT_RANKS = list(range(13))
     PRIMES = [2, 3, 5, 7, 11, 13, 17, 19, 23, 29, 31, 37, 41]
 
     # converstion from string => int
@@ -42,10 +42,10 @@ class Card ():
 
     # for pretty printing
     PRETTY_SUITS = {
-        1 : u"\u2660".encode('utf-8'), # spades
-        2 : u"\u2764".encode('utf-8'), # hearts
-        4 : u"\u2666".encode('utf-8'), # diamonds
-        8 : u"\u2663".encode('utf-8') # clubs
+        1 : "\u2660", # spades
+        2 : "\u2764", # hearts
+        4 : "\u2666", # diamonds
+        8 : "\u2663" # clubs
     }
 
      # hearts and diamonds
@@ -196,7 +196,7 @@ class Card ():
         """
         Expects a single integer as input
         """
-        print Card.int_to_pretty_str(card_int)
+        print(Card.int_to_pretty_str(card_int))
 
     @staticmethod
     def print_pretty_cards(card_ints):
@@ -211,4 +211,4 @@ class Card ():
             else:
                 output += Card.int_to_pretty_str(c) + " "
     
-        print output
+        print(output)
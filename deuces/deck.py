@@ -1,5 +1,5 @@
 from random import shuffle
-from card import Card
+from .card import Card
 
 class Deck:
     """
@@ -36,7 +36,7 @@ class Deck:
 
         # create the standard 52 card deck
         for rank in Card.STR_RANKS:
-            for suit,val in Card.CHAR_SUIT_TO_INT_SUIT.iteritems():
+            for suit,val in Card.CHAR_SUIT_TO_INT_SUIT.items():
                 Deck._FULL_DECK.append(Card.new(rank + suit))
 
         return list(Deck._FULL_DECK)
\ No newline at end of file
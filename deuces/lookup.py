@@ -1,5 +1,5 @@
 import itertools
-from card import Card
+from .card import Card
 
 class LookupTable(object):
     """
@@ -100,7 +100,7 @@ class LookupTable(object):
 
         # 1277 = number of high cards
         # 1277 + len(str_flushes) is number of hands with all cards unique rank
-        for i in xrange(1277 + len(straight_flushes) - 1): # we also iterate over SFs
+        for i in range(1277 + len(straight_flushes) - 1): # we also iterate over SFs
             # pull the next flush pattern from our generator
             f = next(gen)
 
@@ -166,7 +166,7 @@ class LookupTable(object):
         """
         Pair, Two Pair, Three of a Kind, Full House, and 4 of a Kind.
         """
-        backwards_ranks = range(len(Card.INT_RANKS) - 1, -1, -1)
+        backwards_ranks = list(range(len(Card.INT_RANKS) - 1, -1, -1))
 
         # 1) Four of a Kind
         rank = LookupTable.MAX_STRAIGHT_FLUSH + 1
@@ -252,7 +252,7 @@ class LookupTable(object):
         Writes lookup table to disk
         """
         with open(filepath, 'w') as f:
-            for prime_prod, rank in table.iteritems():
+            for prime_prod, rank in table.items():
                 f.write(str(prime_prod) +","+ str(rank) + '\n')
 
     def get_lexographically_next_bit_sequence(self, bits):
@@ -264,9 +264,9 @@ class LookupTable(object):
         so no need to sort when done! Perfect.
         """
         t = (bits | (bits - 1)) + 1 
-        next = t | ((((t & -t) / (bits & -bits)) >> 1) - 1)  
+        next = t | ((((t & -t) // (bits & -bits)) >> 1) - 1)  
         yield next
         while True:
             t = (next | (next - 1)) + 1 
-            next = t | ((((t & -t) / (next & -next)) >> 1) - 1)
+            next = t | ((((t & -t) // (next & -next)) >> 1) - 1)
             yield next
\ No newline at end of file
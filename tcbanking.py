@@ -30,41 +30,43 @@ bet_size = np.array([20,20,20,20])
 
 tcpoker = ThreeCardPoker()
 
-print "Three Card Poker - Player Banking Simulator\n\n"
+print("Three Card Poker - Player Banking Simulator\n\n")
 
-print "Drawing cards for %d rounds of play," % NUM_ROUNDS
-print "Each with %d regular players and one player/dealer..." % NUM_PLAYERS,
+print("Drawing cards for %d rounds of play," % NUM_ROUNDS)
+print("Each with %d regular players and one player/dealer..." % NUM_PLAYERS, end=' ')
 hands = tcpoker.GenerateHands(NUM_ROUNDS,NUM_PLAYERS)
 
-print "DONE"
-print "Evaluating hand values (for %d total hands)..." % ((NUM_PLAYERS+1) * NUM_ROUNDS),
+print("DONE")
+print("Evaluating hand values (for %d total hands)..." % ((NUM_PLAYERS+1) * NUM_ROUNDS), end=' ')
 values = tcpoker.evaluate_hands(hands)
 
-print "DONE"
-print "Determining wins, losses, and bonus payouts...",
+print("DONE")
+print("Determining wins, losses, and bonus payouts...", end=' ')
 multipliers = tcpoker.GenerateMultipliers(hands, values, NUM_PLAYERS)
-multipliers[:] *= bet_size
-adj_payouts = tcpoker.AdjustForAction(multipliers, BANK_AMOUNT)
 
-print "DONE\n\n"
+#We are interested in returns from the player/dealer's perspective,
+#Who wins when the other plays lose and vice versa
+adj_payouts = tcpoker.AdjustForAction(multipliers, BANK_AMOUNT, bet_size, sign=-1)
+
+print("DONE\n\n")
 
 del hands
 
 
-#We are interested in returns from the player/dealer's perspective,
-#Who wins when the other plays lose and vice versa
-adj_payouts[:] *= -1
+#Dollar amounts won or lost by each player hand before adjusting for max payouts
+hand_payouts = multipliers.dot(bet_size)
 
+print("Total player/dealer profit/loss:  $%d ($%d per round)" % (adj_payouts.sum(), adj_payouts.sum(axis=2).sum(axis=1).mean()))
+print("Profit/loss unadjusted for max payouts: $%d ($%d per round)\n\n" % (-hand_payouts.sum(), -hand_payouts.sum(axis=1).mean()))
 
-print "Total player/dealer profit/loss:  $%d ($%d per round)" % (adj_payouts.sum(), adj_payouts.sum(axis=2).sum(axis=1).mean())
-print "Profit/loss unadjusted for max payouts: $%d ($%d per round)\n\n" % (-multipliers.sum(), -multipliers.sum(axis=2).sum(axis=1).mean())
+del hand_payouts
 
 del multipliers
 
-print "Total Profit/Loss per betting spot\n"
+print("Total Profit/Loss per betting spot\n")
 
 for spot_name, spot_values in zip(["Play", "Ante", "P-Plus", "6-card"], adj_payouts.sum(axis=1).T):
-    print spot_name + ":\t\t" + str(spot_values.sum())
+    print(spot_name + ":\t\t" + str(spot_values.sum()))
 
 
 #Split hands into rounds and take all but the first hand (the dealer hand) from each
@@ -87,15 +89,15 @@ value_labels = ["Royal Flush:",
                 "Pair:\t",
                 "High card:"]
 
-value_hist, value_bins = np.array(np.histogram(player_values, bins=value_bins))
+value_hist, value_bins = np.histogram(player_values, bins=value_bins)
 total_values = value_hist.sum()
 
-print "\n\nPlayer hands by type\n"
+print("\n\nPlayer hands by type\n")
 
 for label, value in zip(value_labels, value_hist):
-    print label +"\t\t" + str(value) + "\t(%.1f%%)" % (value/float(total_values)*100)
+    print(label +"\t\t" + str(value) + "\t(%.1f%%)" % (value/float(total_values)*100))
 
-print "\n\n"
+print("\n\n")
 
 pdf = backend_pdf.PdfPages("Charts.pdf")
 
@@ -117,20 +119,19 @@ plt.xlabel('Betting Rounds')
 pdf.savefig()
 plt.close()
 
-#Split an array into strides of length window
-#Eg. For window=3, [0,1,2,3,4,5,...] -> [0,1,2],[1,2,3],[2,3,4],...
-#http://www.rigtorp.se/2011/01/01/rolling-statistics-numpy.html
-def rolling_window(a, window):
-    shape = a.shape[:-1] + (a.shape[-1] - window + 1, window)
-    strides = a.strides + (a.strides[-1],)
-    return np.lib.stride_tricks.as_strided(a, shape=shape, strides=strides)
+#Sum an array over every run of window consecutive elements
+#Eg. For window=3, [0,1,2,3,4,5,...] -> [0+1+2, 1+2+3, 2+3+4, ...]
+#Each sum is the difference of two running totals, so the cost does not grow with the window
+def rolling_sum(a, window):
+    c = np.concatenate(([0], a.cumsum()))
+    return c[window:] - c[:-window]
 
-returns_by_hundred = rolling_window(returns_by_round, 100).sum(axis=1)
+returns_by_hundred = rolling_sum(returns_by_round, 100)
 
 #Normalize
 y,x = np.histogram(returns_by_hundred, bins=8)
-xm = [(x[i]+x[i+1])/2 for i in xrange(len(x)-1)]
-y = y/float(y.sum())*100
+xm = 0.5*(x[:-1]+x[1:])
+y = y.astype(float)/y.sum()*100.0
 
 plt.figure()
 plt.bar(xm,y,xm[1]-xm[0])
@@ -140,11 +141,11 @@ plt.xlabel('Return')
 pdf.savefig()
 plt.close()
 
-returns_by_thousand = rolling_window(returns_by_round, 1000).sum(axis=1)
+returns_by_thousand = rolling_sum(returns_by_round, 1000)
 
 y,x = np.histogram(returns_by_thousand, bins=8)
-xm = [(x[i]+x[i+1])/2 for i in xrange(len(x)-1)]
-y = y/float(y.sum())*100
+xm = 0.5*(x[:-1]+x[1:])
+y = y.astype(float)/y.sum()*100.0
 
 plt.figure()
 plt.bar(xm,y,xm[1]-xm[0])
@@ -0,0 +1,140 @@
+import numpy as np
+from numba import njit, prange
+
+from deuces.card import Card
+
+__author__ ="Charles Nathan Smith"
+__license__ = "GPLv3"
+
+
+#Knuth's multiplicative hash constant, used to scatter prime products across the hash table
+HASH_MULTIPLIER = 2654435761
+
+
+def hash_arrays(lookup, bits=14):
+    """
+    Export one of deuces' prime product lookup dicts into an open addressed hash table
+    held in a pair of int32 arrays of size 2**bits
+    
+    Returns (keys, values) such that hash_lookup(prime, keys, values) == lookup[prime]
+    Empty slots have a key of 0, which is never a prime product
+    At the default size the unsuited table's 6175 keys fill about 38% of the slots,
+    so most lookups find their key in the first slot probed
+    """
+    keys = np.zeros(1 << bits, dtype=np.int32)
+    values = np.zeros(1 << bits, dtype=np.int32)
+    mask = (1 << bits) - 1
+
+    for prime, rank in lookup.items():
+        slot = ((prime * HASH_MULTIPLIER) >> 16) & mask
+
+        #Linear probing
+        while keys[slot]:
+            slot = (slot + 1) & mask
+
+        keys[slot] = prime
+        values[slot] = rank
+
+    return keys, values
+
+
+@njit
+def hash_lookup(prime, keys, values):
+    """
+    Find the rank of a prime product in a hash table built by hash_arrays
+    """
+    mask = keys.shape[0] - 1
+    slot = ((prime * HASH_MULTIPLIER) >> 16) & mask
+
+    while keys[slot] != prime:
+        slot = (slot + 1) & mask
+
+    return values[slot]
+
+
+def flush_array(flush_lookup):
+    """
+    Export deuces' flush lookup dict into a dense int32 array indexed by the 13 rank bits of a flush
+    
+    The rank bits of a 5-card flush are simply (c0 | c1 | c2 | c3 | c4) >> 16,
+    so flushes can be ranked with a single array load instead of a search
+    Entries that are not 5-card flushes are -1
+    """
+    flushes = np.full(1 << 13, -1, dtype=np.int32)
+
+    for rankbits in range(1 << 13):
+        if bin(rankbits).count('1') == 5:
+            flushes[rankbits] = flush_lookup[Card.prime_product_from_rankbits(rankbits)]
+
+    return flushes
+
+
+@njit
+def five_eval(c0, c1, c2, c3, c4, flushes, unsuited_keys, unsuited_values):
+    """
+    Compiled version of deuces' Evaluator._five for 5 cards in integer form
+    """
+    if c0 & c1 & c2 & c3 & c4 & 0xF000:
+        return flushes[(c0 | c1 | c2 | c3 | c4) >> 16]
+
+    prime = (c0 & 0xFF) * (c1 & 0xFF) * (c2 & 0xFF) * (c3 & 0xFF) * (c4 & 0xFF)
+
+    return hash_lookup(prime, unsuited_keys, unsuited_values)
+
+
+@njit(parallel=True)
+def three_eval_batch(hands, lookup_arr, flush_offset, out):
+    """
+    Evaluate an array of Three Card Poker hands (num_hands, 3) in a single pass
+    
+    Equivalent to:
+    out[i] = lookup_arr[(hands[i][0] & 0xFF) * (hands[i][1] & 0xFF) * (hands[i][2] & 0xFF)]
+                 - flush_offset * (hands[i][0] & hands[i][1] & hands[i][2] & 0xF000 != 0)
+    """
+    for i in prange(hands.shape[0]):
+        c0 = hands[i, 0]
+        c1 = hands[i, 1]
+        c2 = hands[i, 2]
+
+        prime = (c0 & 0xFF) * (c1 & 0xFF) * (c2 & 0xFF)
+
+        if c0 & c1 & c2 & 0xF000:
+            out[i] = lookup_arr[prime] - flush_offset
+        else:
+            out[i] = lookup_arr[prime]
+
+
+@njit
+def six_eval(c0, c1, c2, c3, c4, c5, flushes, unsuited_keys, unsuited_values):
+    """
+    Compiled version of deuces' Evaluator._six for 6 cards in integer form
+    
+    Performs the 5-card evaluation on each of the (6 choose 5) = 6 subsets
+    and keeps the best (lowest) ranking
+    """
+    #Each subset is made by leaving out one of the 6 cards
+    return min(five_eval(c1, c2, c3, c4, c5, flushes, unsuited_keys, unsuited_values),
+               five_eval(c0, c2, c3, c4, c5, flushes, unsuited_keys, unsuited_values),
+               five_eval(c0, c1, c3, c4, c5, flushes, unsuited_keys, unsuited_values),
+               five_eval(c0, c1, c2, c4, c5, flushes, unsuited_keys, unsuited_values),
+               five_eval(c0, c1, c2, c3, c5, flushes, unsuited_keys, unsuited_values),
+               five_eval(c0, c1, c2, c3, c4, flushes, unsuited_keys, unsuited_values))
+
+
+@njit(parallel=True)
+def six_eval_rounds(rounds, flushes, unsuited_keys, unsuited_values, out):
+    """
+    Evaluate the 6-card hands made from the dealer hand and each player hand of every round
+    
+    rounds is an array of hands (num_rounds, all_hands, 3) with the dealer hand first in each round
+    
+    Equivalent to out[i, j] = Evaluator()._six(rounds[i, 0] + rounds[i, j+1]) for every player hand
+    """
+    for i in prange(rounds.shape[0]):
+        d0 = rounds[i, 0, 0]
+        d1 = rounds[i, 0, 1]
+        d2 = rounds[i, 0, 2]
+
+        for j in range(rounds.shape[1] - 1):
+            out[i, j] = six_eval(d0, d1, d2, rounds[i, j+1, 0], rounds[i, j+1, 1], rounds[i, j+1, 2],
+                                 flushes, unsuited_keys, unsuited_values)
@@ -1,3 +1,8 @@
+import numpy as np
+import os
+import os.path as path
+from tempfile import mkstemp
+
 __author__ ="Charles Nathan Smith"
 __license__ = "GPLv3"
 
@@ -41,52 +46,122 @@ class ThreeCardLookup(object):
     MIN_HIGH_CARD = 873 #MIN_FLUSH + FLUSH_OFFSET
     MAX_HIGH_CARD = 1146 #MIN_HIGH_CARD + 274-1
     
-    lookup = {}
-    
     STR_RANKS = 'A23456789TJQKA'
     PRIMES = [41, 2, 3, 5, 7, 11, 13, 17, 19, 23, 29, 31, 37, 41]
     
-    def __init__(self):
+    #The largest prime product is AAA
+    TABLE_SIZE = PRIMES[13]**3 + 1
+    
+    #The table is saved here after it is first built
+    #Bump TABLE_VERSION whenever build_lookup changes so old caches are not picked up
+    TABLE_VERSION = 2
+    CACHE_FILE = path.join(path.dirname(path.abspath(__file__)), 'tc_lookup_v%d.npy' % TABLE_VERSION)
+    
+    def __init__(self, cache_file=CACHE_FILE):
+        """
+        Load the Three Card Poker lookup table from cache_file,
+        building it and saving it there if it has not been cached yet
+        or the cached copy is unreadable
+        
+        Use cache_file=None to always build the table
+        """
+
+        if cache_file is not None:
+            try:
+                lookup_arr = np.load(cache_file, mmap_mode='r')
+            except (OSError, ValueError, EOFError):
+                #Missing, truncated or corrupt
+                lookup_arr = None
+
+            if lookup_arr is not None and lookup_arr.dtype == np.int32 and lookup_arr.shape == (self.TABLE_SIZE,):
+                self.lookup_arr = lookup_arr
+                return
+
+        self.build_lookup()
+
+        if cache_file is not None:
+            self.save_lookup(cache_file)
+
+
+    def save_lookup(self, cache_file):
+        """
+        Save lookup_arr to cache_file
+        
+        The table is written to a temporary file in the same directory and then renamed into place,
+        so a concurrent or interrupted run never leaves a partially written cache behind
+        """
+
+        try:
+            fd, tmp_file = mkstemp(suffix='.npy', dir=path.dirname(cache_file))
+        except OSError:
+            #Not writable, the table will just be rebuilt next time
+            return
+
+        try:
+            with os.fdopen(fd, 'wb') as f:
+                np.save(f, self.lookup_arr)
+
+            os.replace(tmp_file, cache_file)
+        except OSError:
+            try:
+                os.remove(tmp_file)
+            except OSError:
+                pass
+
+
+    def build_lookup(self):
         """
         Calculate Three Card Poker lookup table
         Lookup table maps hands to unsuited ranks
         These can be converted to suited ranks by subtracting FLUSH_OFFSET
+        
+        lookup_arr holds the table as a dense int32 array indexed by prime product,
+        with -1 marking products that are not valid hands
         """
 
+        lookup = {}
+
         #straight flushes and straights
         #Set the unsuited straights, then straight flushes can be easily calculated from these
         #By subtracting FLUSH_OFFSET
     
         rank = self.MIN_STRAIGHT_FLUSH
     
-        for i in xrange(13, 1, -1):
-            self.lookup[self.PRIMES[i] * self.PRIMES[i-1] * self.PRIMES[i-2]] = rank + self.FLUSH_OFFSET
+        for i in range(13, 1, -1):
+            lookup[self.PRIMES[i] * self.PRIMES[i-1] * self.PRIMES[i-2]] = rank + self.FLUSH_OFFSET
             rank += 1
     
         #Trips
-        for i in xrange(13, 0, -1):
-            self.lookup[self.PRIMES[i]**3] = rank
+        for i in range(13, 0, -1):
+            lookup[self.PRIMES[i]**3] = rank
             rank +=1
 
         #Flushes and High cards
         #Flushes = High cards - FLUSH_OFFSET
         rank = self.MIN_HIGH_CARD
 
-        for c1 in xrange(13, 0, -1):
-            for c2 in xrange(c1 - 1, 0, -1):
-                for c3 in xrange(c2 - 1, 0, -1):
+        for c1 in range(13, 0, -1):
+            for c2 in range(c1 - 1, 0, -1):
+                for c3 in range(c2 - 1, 0, -1):
                     multiple = self.PRIMES[c1] * self.PRIMES[c2] * self.PRIMES[c3]
 
                     #skip straights
-                    if multiple not in self.lookup:
-                        self.lookup[multiple] = rank
+                    if multiple not in lookup:
+                        lookup[multiple] = rank
                         rank += 1
 
         #Pairs
         rank = self.MIN_PAIR
 
-        for i in xrange(13, 0, -1):
-            for kicker in xrange(13, 0, -1):
+        for i in range(13, 0, -1):
+            for kicker in range(13, 0, -1):
                 if kicker != i:
-                    self.lookup[self.PRIMES[i]**2 * self.PRIMES[kicker]] = rank
+                    lookup[self.PRIMES[i]**2 * self.PRIMES[kicker]] = rank
                     rank += 1
+
+        #Dense copy of the lookup table indexed directly by prime product
+        #so hands can be evaluated with a single array load rather than a dict lookup
+        self.lookup_arr = np.full(self.TABLE_SIZE, -1, dtype=np.int32)
+
+        for prime, rank in lookup.items():
+            self.lookup_arr[prime] = rank
@@ -3,6 +3,7 @@ from tempfile import mkdtemp
 import os.path as path
 
 from threecardlookup import ThreeCardLookup
+from threecardkernels import hash_arrays, flush_array, three_eval_batch, six_eval_rounds
 from deuces.card import Card
 from deuces.deck import Deck
 from deuces.evaluator import Evaluator
@@ -15,18 +16,48 @@ class ThreeCardPoker(object):
     """
     Provide fast vectorized generation and evaluation of Three Card Poker hands
     
-    All arrays returned are memmapped -
+    Arrays larger than memmap_threshold bytes are memmapped -
         use "del array_name" when finished to close open file references
+    Smaller arrays are kept in RAM
     """
     
-    def __init__(self, data_dir=None):
+    #Number of rounds shuffled at a time by GenerateHands
+    SHUFFLE_BLOCK = 100000
+    
+    #Default size in bytes above which arrays are memmapped to disk
+    MEMMAP_THRESHOLD = 256 * 1024**2
+    
+    def __init__(self, data_dir=None, memmap_threshold=MEMMAP_THRESHOLD, seed=None):
         self.tc_lookup = ThreeCardLookup()
         self.FULL_DECK = Deck.GetFullDeck()
         
+        #deuces' 5-card tables exported for the compiled 6-card evaluator
+        self.evaluator = Evaluator()
+        self.six_card_tables = (flush_array(self.evaluator.table.flush_lookup),) + hash_arrays(self.evaluator.table.unsuited_lookup)
+        
         if data_dir is None:
             self.tmp_dir = mkdtemp()
         else:
             self.tmp_dir = data_dir
+        
+        #Use 0 to memmap every array
+        self.memmap_threshold = memmap_threshold
+        
+        #Single random stream used for every deal, pass a seed for repeatable simulations
+        self.rng = np.random.default_rng(seed)
+
+
+    def _alloc(self, data_dir, filename, shape, dtype='int32'):
+        """
+        Allocate an uninitialized array
+        
+        The array is memmapped to data_dir/filename if it is larger than memmap_threshold bytes,
+        otherwise it is held in RAM to avoid the page fault and flush overhead of the memmap
+        """
+        if np.prod(shape) * np.dtype(dtype).itemsize > self.memmap_threshold:
+            return np.memmap(path.join(data_dir, filename), dtype=dtype, mode='w+', shape=shape)
+        
+        return np.empty(shape, dtype=dtype)
 
     
     def GenerateHands(self, num_rounds, num_players=4, data_dir=None):
@@ -57,15 +88,21 @@ class ThreeCardPoker(object):
         #     (player_card_0.3.0, player_card_0.3.1, player_card_0.3.2),
         #     (dealer_card_1.0, ...]
 
-        hands = np.memmap(path.join(data_dir,'played_hands'), dtype='int32', mode='w+', shape=(num_rounds * all_players, 3))
+        hands = self._alloc(data_dir, 'played_hands', (num_rounds * all_players, 3))
 
 
         bank_rounds = hands.reshape(-1, 3 * all_players)    #3 card per hand
-        full_deck = Deck.GetFullDeck()
-
-        for bank_round in bank_rounds:
-            #Draw dealer hand and player hands from a single deck for each round
-            bank_round[:] = np.random.choice(full_deck, size=3*all_players, replace=False)
+        full_deck = np.array(Deck.GetFullDeck(), dtype=np.int32)
+
+        #Draw dealer hand and player hands from a single deck for each round
+        #Every row holds a full deck which is shuffled independently in place,
+        #and the first 3*all_players cards of each shuffle are dealt
+        #Rounds are shuffled in blocks to bound the size of the (rounds, 52) decks
+        for start in range(0, num_rounds, self.SHUFFLE_BLOCK):
+            block = bank_rounds[start:start + self.SHUFFLE_BLOCK]
+            decks = np.broadcast_to(full_deck, (len(block), len(full_deck))).copy()
+            self.rng.permuted(decks, axis=1, out=decks)
+            block[:] = decks[:, :3 * all_players]
 
         return hands
 
@@ -84,7 +121,7 @@ class ThreeCardPoker(object):
 
         suited = 1 if suit else 0
 
-        return self.tc_lookup.lookup[prime] - suited * self.tc_lookup.FLUSH_OFFSET
+        return self.tc_lookup.lookup_arr[prime] - suited * self.tc_lookup.FLUSH_OFFSET
 
 
     def evaluate_hands(self, hands, data_dir=None):
@@ -99,39 +136,14 @@ class ThreeCardPoker(object):
         num_hands = len(hands)
         
 
-        #int rank value, A=12, K=11, etc..
-        hand_ranks = np.memmap(path.join(data_dir,'hand_ranks'), dtype='int32', mode='w+', shape=(num_hands, 3))
-        
-        #Equals FLUSH_OFFSET for suited hands and 0 for unsuited hands
-        hand_flush_adj = np.memmap(path.join(data_dir, 'hand_flush_adjs'), dtype='int32', mode='w+', shape=(num_hands))
-
-        #Multiplied hand ranks (hand_rank[0] * hand_rank[1] * hand_rank[2])
-        hand_primes = np.memmap(path.join(data_dir,'hand_primes'), dtype='int32', mode='w+', shape=(num_hands))
-        
         #Output array
-        hand_values = np.memmap(path.join(data_dir, 'hand_values'), dtype='int32', mode='w+', shape=(num_hands))
+        #Hand values never exceed MAX_HIGH_CARD, so int16 is wide enough
+        hand_values = self._alloc(data_dir, 'hand_values', (num_hands), 'int16')
 
         
         #Array-wide version of tc_evaluate_hand
-        
-        #Equivalent to:
-        #hand_value[i] = self.tc_lookup.lookup[(hands[i][0] & 0xFF) * (hands[i][1] & 0xFF) * (hands[i][2] & 0xFF)]
-        #                    - FLUSH_OFFSET * (hands[i][0] & hands[i][1] & hands[i][2] & 0xF000)
-
-        hand_ranks[:] = hands & 0xFF
-        hand_primes[:] = np.multiply.reduce(hand_ranks, axis=1)
-        
-        #We want to use bitwise_and.reduce(axis=1) here, but there are known bugs in its implementation
-        #that keep it from doing what we expect.  We settle for using DeMorgan's identity as recommended
-        #http://stackoverflow.com/questions/21050875/numpy-bitwise-and-reduce-behaving-unexpectedly
-        hand_flush_adj[:] = np.where(~np.bitwise_or.reduce(np.invert(hands), axis=1) & 0xF000, self.tc_lookup.FLUSH_OFFSET, 0)
-
-        tc_eval = np.vectorize(lambda x: self.tc_lookup.lookup[x])
-        hand_values[:] = tc_eval(hand_primes) - hand_flush_adj
-        
-        del hand_ranks
-        del hand_flush_adj
-        del hand_primes
+        #Each hand is read once and its value written directly, without intermediate arrays
+        three_eval_batch(hands, self.tc_lookup.lookup_arr, self.tc_lookup.FLUSH_OFFSET, hand_values)
         
         return hand_values
 
@@ -166,14 +178,15 @@ class ThreeCardPoker(object):
 
 
         all_hands = num_players+1        
-        num_rounds = len(hands)/all_hands
-
-        multipliers = np.memmap(path.join(data_dir,'multipliers'), dtype='int32', mode='w+', shape=(num_rounds, num_players, 4))
+        num_rounds = len(hands)//all_hands
 
-        play_multipliers = multipliers[:,:,0]
-        ante_multipliers = multipliers[:,:,1]
-        pair_plus_multipliers = multipliers[:,:,2]
-        six_card_multipliers = multipliers[:,:,3]
+        #Each betting spot is built in its own contiguous array
+        #and only interleaved into multipliers once all of them are done
+        #These use the narrowest types that hold their multiples (at most 50x for Pair Plus, 1000x for 6-Card)
+        play_multipliers = self._alloc(data_dir, 'play_multipliers', (num_rounds, num_players), 'int8')
+        ante_multipliers = self._alloc(data_dir, 'ante_multipliers', (num_rounds, num_players), 'int8')
+        pair_plus_multipliers = self._alloc(data_dir, 'pair_plus_multipliers', (num_rounds, num_players), 'int8')
+        six_card_multipliers = self._alloc(data_dir, 'six_card_multipliers', (num_rounds, num_players), 'int16')
 
 
         #group hand values into sets of 1 dealer hand + related player hands
@@ -185,8 +198,8 @@ class ThreeCardPoker(object):
 
         #Lower valued hands beat higher valued hands
         #Win_lose = -1 for player hands that lose, 1 for wins, and 0 for ties
-        win_lose = np.memmap(path.join(data_dir,'win_lose'), dtype='int32', mode='w+', shape=(num_rounds, num_players))
-        win_lose[:] = np.copysign(1, dealer_values - player_values)
+        win_lose = self._alloc(data_dir, 'win_lose', (num_rounds, num_players), 'int8')
+        win_lose[:] = np.sign(dealer_values - player_values)
         
         #Hand and card ranks needed to determine when play bet should be made for each hand
         #The suits are arbitrary as long as these are unsuited hands
@@ -199,14 +212,10 @@ class ThreeCardPoker(object):
 
         
         #In each round, one dealer card is dealt face up
-        #Here we build an array view containing the first dealer card for each round as our face up card
-        #hands.reshape(1,-1)[0] is equivalent to hands.flatten() without copying into a new array
+        #The first dealer card for each round is taken as our face up card
+        #and converted to its int rank, read through a strided view of hands without copying the hands
         
-        dealer_face_up = hands.reshape(1,-1)[0][0::all_hands*3].reshape(-1,1)
-
-
-        #Face up dealer cards are converted to int ranks
-        #face_up_rank = (dealer_face_up>>8)&0xFF
+        face_up_rank = ((hands[::all_hands,0]>>8)&0xF).astype(np.int8).reshape(-1,1)
 
         #Hand plays based on House Way:
         #    Always play A high or better
@@ -216,9 +225,16 @@ class ThreeCardPoker(object):
 
         #Play the hand = 1, don't play = 0
 
-        play_multipliers[:] = np.where(player_values <= ACE_HIGH, 1,
-                                  np.where(player_values <= KING_HIGH, np.where((dealer_face_up>>8)&0xF < ACE, 1, 0),
-                                      np.where(player_values <= QUEEN_HIGH, np.where((dealer_face_up>>8)&0xF < KING, 1, 0), 0)))
+        #The House Way as a decision table indexed by [face up rank, player hand bucket]
+        #Player hands are bucketed as 0 = A high or better, 1 = K high, 2 = Q high, 3 = worse than Q high
+        play_table = np.zeros((len(Card.INT_RANKS), 4), dtype=np.int8)
+        play_table[:, 0] = 1
+        play_table[:ACE, 1] = 1
+        play_table[:KING, 2] = 1
+
+        hand_buckets = np.searchsorted([ACE_HIGH, KING_HIGH, QUEEN_HIGH], player_values)
+
+        play_multipliers[:] = play_table[face_up_rank, hand_buckets]
 
         
         #Pair Plus bonus loses (-1) when a player's hand is less than a pair
@@ -234,13 +250,18 @@ class ThreeCardPoker(object):
         #    Straight flush: 30x
         #    Royal flush: 50x
 
-        pair_plus_multipliers[:] = np.where(play_multipliers == 0, -1,
-                                       np.where(player_values > self.tc_lookup.MAX_PAIR, -1,
-                                           np.where(player_values > self.tc_lookup.MAX_FLUSH, 1,
-                                               np.where(player_values > self.tc_lookup.MAX_STRAIGHT, 3,
-                                                  np.where(player_values > self.tc_lookup.MAX_TRIPS, 6,
-                                                      np.where(player_values > self.tc_lookup.MAX_STRAIGHT_FLUSH, 30,
-                                                          np.where(player_values > 1, 40, 50)))))))
+        #Each hand value is bucketed by the highest threshold it does not exceed
+        #and the bucket index selects the payout
+        pp_thresholds = np.array([1,
+                                  self.tc_lookup.MAX_STRAIGHT_FLUSH,
+                                  self.tc_lookup.MAX_TRIPS,
+                                  self.tc_lookup.MAX_STRAIGHT,
+                                  self.tc_lookup.MAX_FLUSH,
+                                  self.tc_lookup.MAX_PAIR])
+        pp_payouts = np.array([50, 40, 30, 6, 3, 1, -1], dtype=np.int8)
+
+        pair_plus_multipliers[:] = pp_payouts[np.searchsorted(pp_thresholds, player_values)]
+        pair_plus_multipliers[play_multipliers == 0] = -1
         
         #Calculate Ante wins/losses
         #If a play bet is not made, ante loses (-1) automatically
@@ -265,37 +286,22 @@ class ThreeCardPoker(object):
         #Now we need to compute the 6-card bonuses
         #These are based on the best 5-card hand that can be made from the player's 3 card and the dealer's 3
 
-        #The first out of each group of hands is the dealer hand for that group
-        #The rest are the player hands
-        #we want groups like: [dcard1, dcard2, dcard3, pcard1, pcard2, pcard3]
-        #to pass to deuces' hand evaluator
-        #This requires some slicing arobatics to avoid building new arrays
-
         #Hands are arranged by round such as dealer_cards, player1_cards, player2_cards, etc.
-        #Then stepped slices are taken and truncated to form slices for each combo of dealer and player cards
+        #so each round is viewed as (all_hands, 3) and the compiled evaluator combines the dealer hand
+        #with each player hand in turn, without building a separate array of 6-card hands
 
         #eg. If hands = [D01, D02, D03, Pa1, Pa2, Pa3, Pb1, Pb2, Pb3,
         #                D11, D12, D13, Pc1, Pc2, Pc3, Pd1, Pd2, Pd3]
         #
-        #Then eval_hands[0] = [[D01, D02, D03, Pa1, Pa2, Pa3],
-        #                      [D11, D12, D13, Pc1, Pc2, Pc3]]
-        #
-        #     eval_hands[1] = [[D01, D02, D03, Pb1, Pb2, Pb3],
-        #                      [D11, D12, D13, Pd1, Pd2, Pd3]]
-
-        eval_hands = [hands.reshape(-1,all_hands,3)[:,::i+1][:,:2].reshape(-1,6) for i in xrange(num_players)]
+        #Then six_card_values[0] = [rank(D01, D02, D03, Pa1, Pa2, Pa3), rank(D01, D02, D03, Pb1, Pb2, Pb3)]
+        #     six_card_values[1] = [rank(D11, D12, D13, Pc1, Pc2, Pc3), rank(D11, D12, D13, Pd1, Pd2, Pd3)]
 
         #calculate 6card bonuses
-        evaluator = Evaluator()
+        evaluator = self.evaluator
 
-        
-        #This is the main bottleneck in the simulator
-        #The only real way to resolve it is to rebuild the deuces library's
-        #hand evaluator to process arrays of hands rather than one at a time,
-        #which is currently beyond the scope of this project
-        
-        for i in xrange(num_players):
-            six_card_multipliers[:,i] = np.apply_along_axis(evaluator._six, 1, eval_hands[i])
+        six_card_values = self._alloc(data_dir, 'six_card_values', (num_rounds, num_players), 'int16')
+
+        six_eval_rounds(hands.reshape(-1, all_hands, 3), *self.six_card_tables, out=six_card_values)
 
         #Map hand values to bonus payouts
 
@@ -316,18 +322,34 @@ class ThreeCardPoker(object):
         #Straight Flush     200
         #Royal Flush        1000
 
-        six_card_multipliers[:] = np.where(six_card_multipliers > SC_MAX_TRIPS, -1,
-                                           np.where(six_card_multipliers > SC_MAX_STRAIGHT, 5,
-                                               np.where(six_card_multipliers > SC_MAX_FLUSH, 10,
-                                                  np.where(six_card_multipliers > SC_MAX_FULL_HOUSE, 15,
-                                                      np.where(six_card_multipliers > SC_MAX_QUADS, 25,
-                                                          np.where(six_card_multipliers > SC_MAX_STRAIGHT_FLUSH, 50,
-                                                              np.where(six_card_multipliers > 1, 200, 1000)))))))
+        sc_thresholds = np.array([1,
+                                  SC_MAX_STRAIGHT_FLUSH,
+                                  SC_MAX_QUADS,
+                                  SC_MAX_FULL_HOUSE,
+                                  SC_MAX_FLUSH,
+                                  SC_MAX_STRAIGHT,
+                                  SC_MAX_TRIPS])
+        sc_payouts = np.array([1000, 200, 50, 25, 15, 10, 5, -1], dtype=np.int16)
+
+        six_card_multipliers[:] = sc_payouts[np.searchsorted(sc_thresholds, six_card_values)]
+
+        del six_card_values
+
+        #The returned multipliers stay int32 since they are scaled up by bet sizes
+        multipliers = self._alloc(data_dir, 'multipliers', (num_rounds, num_players, 4))
+
+        for spot, spot_multipliers in enumerate([play_multipliers, ante_multipliers, pair_plus_multipliers, six_card_multipliers]):
+            multipliers[:,:,spot] = spot_multipliers
+
+        del play_multipliers
+        del ante_multipliers
+        del pair_plus_multipliers
+        del six_card_multipliers
 
         return multipliers
 
 
-    def AdjustForAction(self, payouts, bank_amount, data_dir=None):
+    def AdjustForAction(self, multipliers, bank_amount, bet_size=1, sign=1, data_dir=None):
         """
         Adjust for situations when the Max Payout does not cover all players' bets
         
@@ -339,36 +361,56 @@ class ThreeCardPoker(object):
         until it is exhausted.  Most casinos use one of the hidden dealer cards to randomize
         where action starts for the benefit of the players, but for our puposes, starting from
         seat one is sufficient.
+        
+        multipliers =   Array of multipliers (num_rounds,num_players,4) returned from GenerateMultipliers
+        
+        bank_amount =   Amount risked by the player/dealer in each round
+        
+        bet_size =      Bet per betting spot, either a single amount or one per spot [play, ante, pair-plus, 6-card]
+        
+        sign =          1 for payouts from the players' perspective, -1 for the player/dealer's
+        
+        Returns array of adjusted dollar payouts (num_rounds,num_players,4)
         """
 
         if data_dir is None:
             data_dir = self.tmp_dir
         
-        num_rounds = payouts.shape[0]
-        num_players = payouts.shape[1]
+        num_rounds = multipliers.shape[0]
+        num_players = multipliers.shape[1]
         
         #We check all 4 betting spots (play, ante, pair plus, 6-card) for each hand in turn,
         #hence num_players*4 as the width for each array in this function
-        payouts = payouts.reshape(num_rounds, num_players*4)
-        
-        cum_payout = np.memmap(path.join(data_dir,'cum_payout'), dtype='int32', mode='w+', shape=(num_rounds,num_players*4))
-        adj_payouts = np.memmap(path.join(data_dir,'adj_payouts'), dtype='int32', mode='w+', shape=(num_rounds,num_players*4))
-        
-        #cum_payout is filled with the running total of absolute dollar amounts of wins and losses per round
-        cum_payout[:] = np.absolute(payouts.reshape(-1,num_players*4)).cumsum(axis=1)
-        
-        #If the first win or loss exceeds the amount in the bank,
-        #Then the win or loss is capped at the amount in the bank
-        adj_payouts[:,0] = np.where(cum_payout[:,0] < bank_amount, payouts[:,0], np.copysign(bank_amount, payouts[:,0]))
-        
-        #For all bets after the first, check to see if the bank has been exhausted
-        #If this is the last bet being matched against the bank, the win or loss needs to be
-        #adjusted to the remaining bank balance.
-        #If a previous bet has already exhausted the bank, no subsequent bets are paid or collected,
-        #so this bet's payout should be 0
-        for i in xrange(1, num_players*4):
-            adj_payouts[:,i] = np.where(cum_payout[:,i] < bank_amount, payouts[:,i],
-                                         np.where(cum_payout[:,i-1] < bank_amount,
-                                                  np.copysign(bank_amount - cum_payout[:,i-1], payouts[:,i]), 0))
+        abs_payouts = self._alloc(data_dir, 'abs_payouts', (num_rounds,num_players*4))
+        bank_left = self._alloc(data_dir, 'bank_left', (num_rounds,num_players*4))
+        adj_payouts = self._alloc(data_dir, 'adj_payouts', (num_rounds,num_players*4))
+        
+        #Dollar payouts are scaled straight into adj_payouts, which is then adjusted in place
+        np.multiply(multipliers, bet_size, out=adj_payouts.reshape(num_rounds, num_players, 4), casting='unsafe')
+        
+        np.absolute(adj_payouts, out=abs_payouts)
+        
+        #bank_left is filled with what remains of the bank before each bet is matched against it:
+        #the bank amount less the running total of absolute dollar amounts of the preceding wins and losses,
+        #or 0 once a previous bet has exhausted the bank
+        #Each step is done in place to avoid full size temporaries
+        np.cumsum(abs_payouts, axis=1, out=bank_left)
+        bank_left -= abs_payouts
+        np.subtract(bank_amount, bank_left, out=bank_left)
+        np.clip(bank_left, 0, None, out=bank_left)
+        
+        #Each win or loss is paid in full if the bank covers it,
+        #otherwise it is capped at the remaining bank balance
+        #Once the bank is exhausted, no subsequent bets are paid or collected, so those payouts are 0
+        np.minimum(abs_payouts, bank_left, out=bank_left)
+        np.sign(adj_payouts, out=adj_payouts)
+        
+        if sign < 0:
+            np.negative(adj_payouts, out=adj_payouts)
+        
+        adj_payouts *= bank_left
+
+        del abs_payouts
+        del bank_left
 
         return adj_payouts.reshape(num_rounds, num_players, 4)